@@ -0,0 +1,286 @@
+"""CUPSで画像を印刷するための共通処理"""
+import io
+import os
+import sys
+import cups
+from PIL import Image
+import tempfile
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:
+    cv2 = None
+
+# OpenCVでリサイズする画像の最小ピクセル数
+NP_RESIZE_MIN_PIXELS = 4_000_000
+
+# 個別に表示するオプション（表示順）
+MAIN_OPTIONS = {
+    'InputSlot': '給紙トレイ',
+    'media': '用紙サイズ',
+    'printer-resolution': '解像度',
+}
+
+def _resize_np(arr, width, height):
+    """NumPy配列の画像をOpenCVでリサイズ"""
+    # INTER_LANCZOS4は縮小時にカーネルが広がらずエイリアスが出るため、縮小にはINTER_AREAを使う
+    src_height, src_width = arr.shape[:2]
+    if width < src_width or height < src_height:
+        interpolation = cv2.INTER_AREA
+    else:
+        interpolation = cv2.INTER_LANCZOS4
+    return cv2.resize(arr, (width, height), interpolation=interpolation)
+
+# よく使う画像形式のマジックバイト（PNG, JPEG, GIF, BMP, TIFF）
+IMAGE_SIGNATURES = (b'\x89PNG', b'\xff\xd8\xff', b'GIF8', b'BM', b'II*\x00', b'MM\x00*')
+
+def sniff_image(path):
+    """ファイル先頭のマジックバイトから画像ファイルかどうかを判定"""
+    try:
+        with open(path, 'rb') as f:
+            sig = f.read(16)
+    except OSError:
+        return False
+    
+    # RIFFコンテナはWebPのみ対応（WAVやAVIは除外）
+    if sig.startswith(b'RIFF'):
+        return sig[8:12] == b'WEBP'
+    
+    if sig.startswith(IMAGE_SIGNATURES):
+        return True
+    
+    # その他の形式（PPM, ICO, TGA, JPEG 2000など）はPILにヘッダーを判定させる
+    try:
+        with Image.open(path):
+            return True
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        return False
+
+def has_alpha(image):
+    """画像が透過情報を持つかどうかを判定"""
+    return image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+
+class ImagePrinter:
+    def __init__(self):
+        """CUPSクライアントの初期化"""
+        self._conn = None
+    
+    @property
+    def conn(self):
+        """CUPSへの接続（初回アクセス時に接続）"""
+        if self._conn is None:
+            self._conn = cups.Connection()
+        return self._conn
+    
+    def list_printers(self, show_options=False):
+        """
+        利用可能なプリンターの一覧を取得
+        show_options: Trueの場合、各プリンターの詳細オプションも表示
+        """
+        printers = self.conn.getPrinters()
+        if not printers:
+            print("利用可能なプリンターが見つかりません")
+            return []
+        
+        print("\n利用可能なプリンター:")
+        for i, (printer_name, printer_info) in enumerate(printers.items(), 1):
+            state = "待機中" if printer_info["printer-state"] == 3 else "エラーまたはオフライン"
+            default = " (デフォルト)" if printer_info.get("is-default", False) else ""
+            print(f"{i}. {printer_name}{default} - {state}")
+            
+            if show_options:
+                self.show_printer_options(printer_name)
+                print()
+        
+        return list(printers.keys())
+
+    def show_printer_options(self, printer_name):
+        """プリンターの利用可能なオプションを表示"""
+        try:
+            # プリンターの属性を取得
+            attrs = self.conn.getPrinterAttributes(printer_name)
+            
+            # *-supported属性を1回の走査で振り分け
+            supported = {}
+            for option, values in attrs.items():
+                if not option.endswith('-supported'):
+                    continue
+                option_name = option[:-len('-supported')]
+                if option_name in MAIN_OPTIONS:
+                    supported[option_name] = values if isinstance(values, list) else [values]
+                elif isinstance(values, list):
+                    supported[option_name] = values
+            
+            out = []
+            
+            # 給紙トレイ・用紙サイズ・解像度
+            for option_name, label in MAIN_OPTIONS.items():
+                values = supported.get(option_name)
+                if values:
+                    out.append(f"\n  利用可能な{label}:")
+                    out.extend(f"    - {value}" for value in values)
+            
+            # その他のオプション
+            out.append("\n  その他の設定可能なオプション:")
+            for option_name, values in supported.items():
+                if option_name not in MAIN_OPTIONS:
+                    out.append(f"    {option_name}:")
+                    out.extend(f"      - {value}" for value in values)
+            
+            # まとめて出力
+            sys.stdout.write("\n".join(out) + "\n")
+        
+        except Exception as e:
+            print(f"  オプション取得エラー: {str(e)}")
+
+    def _can_print_directly(self, image_path):
+        """画像ファイルのヘッダーのみを読み、変換せずにCUPSへ渡せるかを判定"""
+        with Image.open(image_path) as image:
+            return (image.format in ('PNG', 'JPEG')
+                    and image.mode in ('RGB', 'L', 'P')
+                    and not has_alpha(image))
+
+    def prepare_image(self, image_path, dpi=300, width=None, height=None):
+        """画像の前処理（リサイズと解像度の設定）"""
+        try:
+            # 画像を開く
+            image = Image.open(image_path)
+            
+            # 白背景との合成で失われるためICCプロファイルを保持しておく
+            icc_profile = image.info.get('icc_profile')
+            
+            # 縮小する場合はJPEGデコーダーで事前に縮小してデコード（JPEG以外では何もしない）
+            if width and height:
+                image.draft('RGB', (width * 2, height * 2))
+            
+            # 透過画像は白背景に合成（アルファを単純に捨てると透過部分が黒くなるため）
+            if has_alpha(image):
+                image = image.convert('RGBA')
+                background = Image.new('RGBA', image.size, 'white')
+                image = Image.alpha_composite(background, image)
+            
+            # RGBモードに変換（必要な場合）
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            
+            # リサイズが指定されている場合
+            if width and height:
+                if cv2 is not None and image.width * image.height >= NP_RESIZE_MIN_PIXELS:
+                    # 大きな画像はOpenCVのベクトル化されたリサイズを使用
+                    arr = _resize_np(np.asarray(image), width, height)
+                    resized = Image.fromarray(arr)
+                    # PILのresizeと同様にICCプロファイルなどのメタデータを引き継ぐ
+                    resized.info.update(image.info)
+                    image = resized
+                else:
+                    image = image.resize((width, height), Image.Resampling.LANCZOS)
+            
+            # DPIとICCプロファイルの設定
+            image.info['dpi'] = (dpi, dpi)
+            if icc_profile:
+                image.info['icc_profile'] = icc_profile
+            
+            return image
+            
+        except Exception as e:
+            raise Exception(f"画像の処理中にエラーが発生しました: {str(e)}")
+
+    def send_image(self, printer_name, image, dpi, options):
+        """画像をPNGとしてエンコードし、印刷ジョブとして送信する"""
+        if not hasattr(self.conn, 'createJob'):
+            # ストリーミング送信が使えない場合はtmpfs上の一時ファイルを経由する
+            # （requirements.txtで指定しているpycups 2.0.4にはcreateJobがあるため、
+            #   通常はこの分岐を通らない。古いpycupsのための予備経路）
+            tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+            tmp_file = tempfile.NamedTemporaryFile(suffix='.png', dir=tmp_dir, delete=False)
+            try:
+                with tmp_file:
+                    image.save(tmp_file, 'PNG', dpi=(dpi, dpi), compress_level=1, optimize=False)
+                
+                return self.conn.printFile(printer_name, tmp_file.name, "Image Printing", options)
+            finally:
+                # 一時ファイルの削除（保存や印刷に失敗した場合も含む）
+                try:
+                    os.unlink(tmp_file.name)
+                except FileNotFoundError:
+                    pass
+        
+        # メモリ上でPNGにエンコード（CUPS側で変換されるため圧縮率より速度を優先）
+        buf = io.BytesIO()
+        image.save(buf, 'PNG', dpi=(dpi, dpi), compress_level=1, optimize=False)
+        data = buf.getvalue()
+        
+        # ディスクを経由せずにジョブを作成してデータを送信
+        # （pycups 2.0のwriteRequestDataはbytesを長さ指定でそのままコピーする）
+        job_id = self.conn.createJob(printer_name, "Image Printing", options)
+        try:
+            self.conn.startDocument(printer_name, job_id, "Image Printing", 'image/png', 1)
+            self.conn.writeRequestData(data, len(data))
+            self.conn.finishDocument(printer_name)
+        except Exception:
+            # 送信に失敗した場合は作成途中のジョブをキューに残さない
+            try:
+                self.conn.cancelJob(job_id)
+            except cups.IPPError:
+                pass
+            raise
+        return job_id
+
+    def print_image(self, image_path, printer_name=None, input_tray=None, 
+                   media=None, dpi=300, width=None, height=None, options=None):
+        """
+        画像を印刷する
+        戻り値: (プリンター名, ジョブID, 印刷オプション)。失敗した場合はNone
+        """
+        try:
+            # プリンター一覧の取得（IPP問い合わせは1回のみ）
+            printers = self.conn.getPrinters()
+            
+            # プリンターの選択
+            if not printer_name:
+                # デフォルトプリンターを使用
+                for name, info in printers.items():
+                    if info.get('is-default', False):
+                        printer_name = name
+                        break
+                if not printer_name:
+                    raise Exception("デフォルトプリンターが設定されていません")
+            
+            # プリンターの存在確認
+            if printer_name not in printers:
+                raise Exception(f"プリンター '{printer_name}' が見つかりません")
+            
+            # 基本印刷オプションの設定
+            print_options = {
+                'fit-to-page': 'True',           # ページに合わせる
+                'resolution': f'{dpi}dpi',       # 解像度
+            }
+            
+            # 給紙トレイの設定
+            if input_tray:
+                print_options['InputSlot'] = input_tray
+            
+            # 用紙サイズの設定
+            if media:
+                print_options['media'] = media
+            
+            # 追加のオプションがある場合は統合
+            if options:
+                print_options.update(options)
+            
+            # 印刷ジョブの送信
+            if not (width and height) and self._can_print_directly(image_path):
+                # リサイズ不要かつCUPSがそのまま扱える形式の場合は再エンコードしない
+                # （透過・CMYK・16bitなどの画像はprepare_imageで正規化する）
+                job_id = self.conn.printFile(printer_name, image_path, "Image Printing", print_options)
+            else:
+                # 画像の準備
+                image = self.prepare_image(image_path, dpi, width, height)
+                job_id = self.send_image(printer_name, image, dpi, print_options)
+            
+            return printer_name, job_id, print_options
+            
+        except Exception as e:
+            print(f"エラーが発生しました: {str(e)}")
+            return None